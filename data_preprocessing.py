@@ -15,6 +15,7 @@ def prepare_bets_data(live_odds, teams_info):
         sport_key = game.get('sport_key')
         home_team = game.get('home_team')
         away_team = game.get('away_team')
+        commence_time = game.get('commence_time')
         bookmakers = game.get('bookmakers', [])
         
         # For each bookmaker, extract odds
@@ -42,6 +43,7 @@ def prepare_bets_data(live_odds, teams_info):
                     if bet_side in ['Home', 'Away']:
                         bets.append({
                             'game_id': game_id,
+                            'commence_time': commence_time,
                             'sport': sport_key,
                             'bookmaker': title,
                             'team': team,
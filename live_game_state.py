@@ -0,0 +1,336 @@
+# live_game_state.py
+
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from statistics import NormalDist
+from zoneinfo import ZoneInfo
+import pandas as pd
+from utils import get_team_info
+
+# Compact per-game row kept in the state table; compared as a tuple to detect changes
+GameState = namedtuple('GameState', ['home_team', 'away_team', 'game_date', 'home_score', 'away_score', 'period', 'clock', 'status'])
+
+GAME_SCHEDULED = 1
+GAME_IN_PROGRESS = 2
+GAME_FINAL = 3
+
+QUARTER_SECONDS = 12 * 60
+REGULATION_PERIODS = 4
+REGULATION_SECONDS = REGULATION_PERIODS * QUARTER_SECONDS
+OVERTIME_SECONDS = 5 * 60
+MARGIN_STDDEV = 13.5  # Std. dev. of an NBA final margin, in points
+EASTERN = ZoneInfo('America/New_York')  # NBA slates are dated in US Eastern time
+
+# Settled legs keep the model features alongside the label so they build up into training data
+SETTLED_COLUMNS = ['game_id', 'commence_time', 'bookmaker', 'team', 'bet_type', 'price', 'point', 'travel_distance', 'winning']
+SETTLE_KEYS = ['game_id', 'bookmaker', 'team', 'bet_type', 'point']
+
+_CLOCK_PATTERN = re.compile(r'PT(\d+)M([\d.]+)S')
+_normal = NormalDist()
+
+def fetch_live_scoreboard():
+    from nba_api.live.nba.endpoints import scoreboard
+    return scoreboard.ScoreBoard().get_dict()
+
+def poll_live_scoreboard(interval=5):
+    # Yield a live snapshot every interval seconds; fetch errors are logged and retried
+    while True:
+        try:
+            yield fetch_live_scoreboard()
+        except Exception as e:
+            print(f"Error fetching live scoreboard, retrying in {interval}s: {e}")
+        time.sleep(interval)
+
+def record_feed(filepath='data/live_feed.jsonl', interval=5, max_snapshots=None):
+    # Append raw live scoreboard snapshots so a slate can be replayed later
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    count = 0
+    for snapshot in poll_live_scoreboard(interval):
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(snapshot) + '\n')
+        count += 1
+        if max_snapshots is not None and count >= max_snapshots:
+            break
+
+def replay_feed(filepath='data/live_feed.jsonl'):
+    # Yield recorded scoreboard snapshots, one per line, in the order they were captured
+    with open(filepath) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def game_date(timestamp):
+    # Eastern calendar date of a UTC tip-off time such as '2024-11-05T00:30:00Z'
+    if not isinstance(timestamp, str) or not timestamp:
+        return None
+    tip_off = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return tip_off.astimezone(EASTERN).strftime('%Y-%m-%d')
+
+def parse_clock(clock):
+    # Live feed clocks look like 'PT05M32.00S' and are empty between periods
+    match = _CLOCK_PATTERN.match(clock or '')
+    if not match:
+        return 0.0
+    return int(match.group(1)) * 60 + float(match.group(2))
+
+def seconds_remaining(period, clock):
+    if period <= 0:
+        return float(REGULATION_SECONDS)
+    if period <= REGULATION_PERIODS:
+        return (REGULATION_PERIODS - period) * QUARTER_SECONDS + parse_clock(clock)
+    return parse_clock(clock)
+
+def parse_games(snapshot, team_id_to_full):
+    games = snapshot.get('scoreboard', snapshot).get('games', [])
+    states = {}
+    for game in games:
+        home = game.get('homeTeam', {})
+        away = game.get('awayTeam', {})
+        home_team = team_id_to_full.get(home.get('teamId'), f"{home.get('teamCity')} {home.get('teamName')}")
+        away_team = team_id_to_full.get(away.get('teamId'), f"{away.get('teamCity')} {away.get('teamName')}")
+        # gameEt is already Eastern time (despite its 'Z' suffix), so only its date part is used
+        date = game_date(game.get('gameTimeUTC')) or (game.get('gameEt') or '')[:10] or None
+        states[game.get('gameId')] = GameState(
+            home_team,
+            away_team,
+            date,
+            int(home.get('score') or 0),
+            int(away.get('score') or 0),
+            int(game.get('period') or 0),
+            game.get('gameClock', ''),
+            int(game.get('gameStatus') or GAME_SCHEDULED)
+        )
+    return states
+
+def leg_margin(leg, state):
+    # Margin from the perspective of the leg's team, including the spread
+    if leg['team'] == state.home_team:
+        margin = state.home_score - state.away_score
+    else:
+        margin = state.away_score - state.home_score
+    if leg['bet_type'] == 'spreads':
+        margin += leg['point']
+    return margin
+
+def live_win_probability(leg, state):
+    # Normal approximation: the remaining margin is centred on the pregame expectation
+    # scaled by the share of the game left, with variance shrinking as the clock runs down
+    if state.status == GAME_SCHEDULED:
+        return leg['pregame_prob']
+    margin = leg_margin(leg, state)
+    # A zero clock on a game that is not final means overtime is still to come
+    remaining = (seconds_remaining(state.period, state.clock) or OVERTIME_SECONDS) / REGULATION_SECONDS
+    pregame_prob = min(max(leg['pregame_prob'], 0.01), 0.99)
+    pregame_point = leg['point'] if leg['bet_type'] == 'spreads' else 0
+    expected_margin = MARGIN_STDDEV * _normal.inv_cdf(pregame_prob) - pregame_point
+    return _normal.cdf((margin + expected_margin * remaining) / (MARGIN_STDDEV * remaining ** 0.5))
+
+class LiveGameTracker:
+    def __init__(self, teams_info):
+        self.team_id_to_full = teams_info.set_index('id')['full_name'].to_dict()
+        self.states = {}
+        self.board = []  # Game ids on the most recent snapshot
+        self.board_date = None  # Slate date the most recent snapshot is for
+        self.legs = {}
+        self.game_legs = defaultdict(set)  # (team, game_date) -> leg ids
+        self.leg_parlays = defaultdict(set)
+        self.parlays = {}
+        self.parlay_scores = {}
+        self.settled = {}
+        self.unsaved = []  # Settled leg ids not yet written by save_settled
+
+    def add_leg(self, leg_id, bet):
+        if leg_id in self.legs:
+            return
+        predicted_prob = bet.get('predicted_prob')
+        if predicted_prob is None or pd.isna(predicted_prob):
+            predicted_prob = 1 / bet['price'] if bet['price'] else 0.5  # Fall back to implied probability
+        self.legs[leg_id] = {
+            'game_id': bet['game_id'],
+            'bookmaker': bet['bookmaker'],
+            'team': bet['team'],
+            'bet_type': bet['bet_type'],
+            'price': bet['price'],
+            'point': bet['point'] if bet['bet_type'] == 'spreads' and not pd.isna(bet['point']) else 0,
+            'commence_time': bet['commence_time'],
+            'travel_distance': bet.get('travel_distance', 0) if not pd.isna(bet.get('travel_distance', 0)) else 0,
+            'game_date': game_date(bet['commence_time']),
+            'pregame_prob': predicted_prob,
+            'live_prob': predicted_prob,
+            'result': None,  # 'won', 'lost' or 'push' once the game is final
+            'winning': None
+        }
+        leg_game = (bet['team'], self.legs[leg_id]['game_date'])
+        self.game_legs[leg_game].add(leg_id)
+        # Legs added mid-slate are priced against the game's current state straight away
+        for state in self.states.values():
+            if leg_game in ((state.home_team, state.game_date), (state.away_team, state.game_date)):
+                self.reprice_leg(leg_id, state)
+
+    def add_parlay(self, parlay_id, bets_df):
+        # bets_df rows are the legs of the parlay, indexed by a stable leg id
+        if bets_df.empty or not bets_df['bet_type'].isin(['h2h', 'spreads']).all():
+            print(f"Skipping parlay {parlay_id}: only h2h and spreads legs can be tracked live.")
+            return
+        # Teams play on consecutive days, so legs are matched to live games by team and game date
+        if 'commence_time' not in bets_df.columns or bets_df['commence_time'].isna().any():
+            print(f"Skipping parlay {parlay_id}: legs have no commence_time to match them to a game.")
+            return
+        for leg_id, bet in bets_df.iterrows():
+            self.add_leg(leg_id, bet)
+            self.leg_parlays[leg_id].add(parlay_id)
+        self.parlays[parlay_id] = list(bets_df.index)
+        self.rescore_parlay(parlay_id)
+
+    def update(self, snapshot):
+        # Apply one scoreboard snapshot; returns the ids of parlays that were rescored
+        new_states = parse_games(snapshot, self.team_id_to_full)
+        self.board = list(new_states)
+        self.board_date = snapshot.get('scoreboard', snapshot).get('gameDate') or max(
+            (state.game_date for state in new_states.values() if state.game_date), default=None)
+        affected_parlays = set()
+        for game_id, state in new_states.items():
+            if self.states.get(game_id) == state:
+                continue
+            self.states[game_id] = state
+            leg_ids = self.game_legs[(state.home_team, state.game_date)] | self.game_legs[(state.away_team, state.game_date)]
+            for leg_id in leg_ids:
+                if self.legs[leg_id]['result'] is not None:
+                    continue
+                self.reprice_leg(leg_id, state)
+                affected_parlays |= self.leg_parlays[leg_id]
+        for parlay_id in affected_parlays:
+            self.rescore_parlay(parlay_id)
+        return affected_parlays
+
+    def reprice_leg(self, leg_id, state):
+        leg = self.legs[leg_id]
+        if state.status == GAME_FINAL:
+            self.settle_leg(leg_id, state)
+        else:
+            leg['live_prob'] = live_win_probability(leg, state)
+
+    def settle_leg(self, leg_id, state):
+        leg = self.legs[leg_id]
+        margin = leg_margin(leg, state)
+        if margin == 0:
+            # A pushed leg is voided: the parlay carries on without it
+            leg['result'] = 'push'
+            leg['live_prob'] = 1.0
+            return
+        leg['result'] = 'won' if margin > 0 else 'lost'
+        leg['winning'] = 1 if margin > 0 else 0
+        leg['live_prob'] = float(leg['winning'])
+        # Pushes are neither a win nor a loss, so only decided legs become training labels
+        self.settled[leg_id] = {column: leg[column] for column in SETTLED_COLUMNS}
+        self.unsaved.append(leg_id)
+
+    def rescore_parlay(self, parlay_id):
+        legs = [self.legs[leg_id] for leg_id in self.parlays[parlay_id]]
+        results = [leg['result'] for leg in legs]
+        if 'lost' in results:
+            status = 'lost'
+        elif None in results:
+            status = 'live'
+        elif 'won' in results:
+            status = 'won'
+        else:
+            status = 'push'  # Every leg pushed, so the stake is returned
+        self.parlay_scores[parlay_id] = {
+            'parlay_id': parlay_id,
+            'legs': len(legs),
+            'legs_settled': sum(result is not None for result in results),
+            'cumulative_odds': round(math.prod(1.0 if leg['result'] == 'push' else leg['price'] for leg in legs), 2),
+            'live_prob': round(math.prod(leg['live_prob'] for leg in legs), 4),
+            'status': status
+        }
+
+    def parlay_table(self, parlay_ids=None):
+        if parlay_ids is None:
+            return pd.DataFrame(list(self.parlay_scores.values()))
+        return pd.DataFrame([self.parlay_scores[parlay_id] for parlay_id in parlay_ids if parlay_id in self.parlay_scores])
+
+    def state_table(self):
+        return pd.DataFrame.from_dict(self.states, orient='index', columns=GameState._fields)
+
+    def settled_legs(self):
+        return pd.DataFrame(list(self.settled.values()), columns=SETTLED_COLUMNS)
+
+    def slate_finished(self):
+        # The tracked slate is the earliest game date among the legs. The board's own gameDate says
+        # which slate it shows, so yesterday's finals before the rollover and games ending after
+        # midnight are both handled without looking at the wall clock.
+        if not self.legs:
+            return True
+        if not self.board_date:
+            return False
+        slate_date = min(leg['game_date'] for leg in self.legs.values())
+        if self.board_date > slate_date:
+            return True  # The board has already rolled over past the tracked slate
+        states = [self.states[game_id] for game_id in self.board]
+        return self.board_date == slate_date and bool(states) and all(state.status == GAME_FINAL for state in states)
+
+    def save_settled(self, filepath='data/settled_legs.csv'):
+        new_legs = pd.DataFrame([self.settled[leg_id] for leg_id in self.unsaved], columns=SETTLED_COLUMNS)
+        self.unsaved = []
+        return save_settled_legs(new_legs, filepath)
+
+    def poll(self, feed=None, interval=5, max_updates=None, settled_filepath=None):
+        # feed is an iterable of snapshots (e.g. replay_feed); without one, poll the live scoreboard
+        count = 0
+        snapshots = feed if feed is not None else poll_live_scoreboard(interval)
+        for snapshot in snapshots:
+            start = time.perf_counter()
+            rescored = self.update(snapshot)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"Update processed in {elapsed_ms:.1f} ms: {len(self.states)} games, {len(rescored)} parlays rescored")
+            # Save settlements as they happen so a crash mid-slate does not lose them
+            if settled_filepath and self.unsaved:
+                self.save_settled(settled_filepath)
+            count += 1
+            if max_updates is not None and count >= max_updates:
+                break
+            if feed is None and self.slate_finished():
+                break
+
+def save_settled_legs(settled_df, filepath='data/settled_legs.csv'):
+    # Merge newly settled legs into the history on disk and return the full history
+    history = pd.read_csv(filepath) if os.path.exists(filepath) else pd.DataFrame(columns=SETTLED_COLUMNS)
+    if settled_df.empty:
+        return history
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    history = pd.concat([history, settled_df]) if not history.empty else settled_df
+    history = history.drop_duplicates(subset=SETTLE_KEYS, keep='last')
+    history.to_csv(filepath, index=False)
+    print(f"Saved {len(history)} settled legs to {filepath}")
+    return history
+
+# Example usage: track every prepared bet as a single-leg parlay and settle it
+if __name__ == "__main__":
+    import sys
+
+    prepared_bets = pd.read_csv('data/prepared_bets.csv')
+    bets_df = prepared_bets[prepared_bets['bet_type'].isin(['h2h', 'spreads'])]
+    tracker = LiveGameTracker(get_team_info())
+    for leg_id, bet in bets_df.iterrows():
+        tracker.add_parlay(leg_id, bets_df.loc[[leg_id]])
+
+    # Pass a recorded feed (see record_feed) to replay it instead of polling live
+    feed = replay_feed(sys.argv[1]) if len(sys.argv) > 1 else None
+    # model_training.py trains on the settled history, so labels survive prepared_bets.csv being regenerated
+    try:
+        tracker.poll(feed, settled_filepath='data/settled_legs.csv')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        settled_history = tracker.save_settled('data/settled_legs.csv')
+
+    print(tracker.state_table())
+    print(f"Settled {len(tracker.settled)} bets this run, {len(settled_history)} in total.")
+    print(f"Live tracking stopped at {datetime.now()}")
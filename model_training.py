@@ -5,12 +5,29 @@ from sklearn.metrics import roc_auc_score, accuracy_score
 import joblib
 import os
 
+# Settled history needed before it replaces prepared_bets.csv; one night is only a few dozen bets
+MIN_SETTLED_BETS = 200
+MIN_SETTLED_PER_CLASS = 20
+
 def load_data(filepath='data/prepared_bets.csv'):
     if not os.path.exists(filepath):
         print(f"Error: {filepath} does not exist.")
         exit(1)
     return pd.read_csv(filepath)
 
+def load_training_data(filepath='data/prepared_bets.csv', settled_filepath='data/settled_legs.csv'):
+    # Prefer bets settled from final scores by live_game_state.py over placeholder labels
+    if os.path.exists(settled_filepath):
+        settled = pd.read_csv(settled_filepath)
+        wins = int(settled['winning'].sum())
+        losses = len(settled) - wins
+        if len(settled) >= MIN_SETTLED_BETS and min(wins, losses) >= MIN_SETTLED_PER_CLASS:
+            print(f"Training on {len(settled)} settled bets from {settled_filepath}.")
+            return settled
+        print(f"Warning: only {len(settled)} settled bets ({wins} wins, {losses} losses) in {settled_filepath}. "
+              f"Need {MIN_SETTLED_BETS} with at least {MIN_SETTLED_PER_CLASS} of each outcome; using {filepath} instead.")
+    return load_data(filepath)
+
 def preprocess_data(df):
     import numpy as np  # Ensure numpy is imported
     
@@ -30,7 +47,7 @@ def preprocess_data(df):
     return X, y
 
 def train_model(X, y):
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
     
     model = RandomForestClassifier(n_estimators=100, random_state=42)
     model.fit(X_train, y_train)
@@ -54,7 +71,7 @@ def save_model(model, filepath='models/nba_bet_model.pkl'):
 
 if __name__ == "__main__":
     # Load data
-    df = load_data()
+    df = load_training_data()
     print("Data loaded successfully.")
 
     # Preprocess data
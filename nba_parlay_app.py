@@ -11,6 +11,7 @@ import requests
 from datetime import datetime
 from geopy.distance import geodesic
 from utils import get_team_info, calculate_travel_distance, get_live_odds
+from live_game_state import LiveGameTracker, fetch_live_scoreboard
 import os
 
 # Suppress warnings from nba_api
@@ -58,6 +59,7 @@ def prepare_bets_data(live_odds, teams_info):
         sport_key = game.get('sport_key')
         home_team = game.get('home_team')
         away_team = game.get('away_team')
+        commence_time = game.get('commence_time')
         bookmakers = game.get('bookmakers', [])
         
         # For each bookmaker, extract odds
@@ -85,6 +87,7 @@ def prepare_bets_data(live_odds, teams_info):
                     if bet_side in ['Home', 'Away']:
                         bets.append({
                             'game_id': game_id,
+                            'commence_time': commence_time,
                             'sport': sport_key,
                             'bookmaker': title,
                             'team': team,
@@ -251,7 +254,7 @@ if selected_indices:
     def generate_parlays(bets, max_legs=3, target_odds=2.00, margin=0.10):
         parlays = []
         for r in range(1, max_legs+1):
-            for parlay in combinations(bets.itertuples(index=False), r):
+            for parlay in combinations(bets.itertuples(), r):
                 cumulative_odds = np.prod([bet.price for bet in parlay])
                 if target_odds * (1 - margin) <= cumulative_odds <= target_odds * (1 + margin):
                     # Calculate cumulative probability (assuming independence)
@@ -260,7 +263,8 @@ if selected_indices:
                         'parlay': ', '.join([f"{bet.team} @ {bet.bookmaker}" for bet in parlay]),
                         'legs': r,
                         'cumulative_odds': round(cumulative_odds, 2),
-                        'cumulative_prob': round(cumulative_prob, 4)
+                        'cumulative_prob': round(cumulative_prob, 4),
+                        'leg_ids': tuple(bet.Index for bet in parlay)
                     })
         return parlays
 
@@ -268,7 +272,7 @@ if selected_indices:
 
     if parlays:
         parlays_df = pd.DataFrame(parlays)
-        st.table(parlays_df)
+        st.table(parlays_df.drop(columns=['leg_ids']))
     else:
         st.write("No parlays generated within the specified odds range.")
 
@@ -297,6 +301,39 @@ if selected_indices:
         else:
             st.write("No parlays available for Kelly Criterion calculation.")
 
+    # Live Parlay Tracking
+    st.subheader("📡 Live Parlay Tracking")
+    if st.button("Refresh Live Scores"):
+        if parlays:
+            # Keep the tracker across reruns so only games whose state changed trigger rescoring
+            if 'live_tracker' not in st.session_state:
+                st.session_state['live_tracker'] = LiveGameTracker(teams_info)
+            tracker = st.session_state['live_tracker']
+            parlay_labels = {}
+            for parlay in parlays:
+                legs = bets_df.loc[list(parlay['leg_ids'])]
+                # Row indices change when odds are refetched, so key legs by the bet itself
+                legs.index = legs['game_id'] + '|' + legs['bookmaker'] + '|' + legs['team'] + '|' + legs['bet_type']
+                parlay_id = tuple(sorted(legs.index))
+                parlay_labels[parlay_id] = ', '.join(legs['team'] + ' ' + legs['bet_type'] + ' @ ' + legs['bookmaker'])
+                if parlay_id not in tracker.parlays:
+                    tracker.add_parlay(parlay_id, legs)
+            try:
+                tracker.update(fetch_live_scoreboard())
+            except Exception as e:
+                st.error(f"Error fetching live scores: {e}")
+            # Keep labels from games watched only in the app; this writes just the new settlements
+            tracker.save_settled('data/settled_legs.csv')
+            # The tracker keeps parlays from earlier selections, so only show the current ones
+            live_parlays = tracker.parlay_table(list(parlay_labels))
+            if not live_parlays.empty:
+                live_parlays.insert(0, 'parlay', [parlay_labels[parlay_id] for parlay_id in live_parlays['parlay_id']])
+                st.table(live_parlays.drop(columns=['parlay_id']))
+            else:
+                st.write("Only parlays made of h2h and spreads bets can be tracked live.")
+        else:
+            st.write("No parlays available to track.")
+
 # Footer
 st.markdown("""
 ---
@@ -0,0 +1,132 @@
+# replay_check.py
+#
+# Replays a recorded full-slate feed through LiveGameTracker and checks repricing,
+# settlement and update latency. Run from the repository root: python replay_check.py
+
+import time
+from itertools import combinations
+import pandas as pd
+from live_game_state import GAME_IN_PROGRESS, GameState, LiveGameTracker, live_win_probability, replay_feed
+from utils import get_team_info
+
+FEED_FILEPATH = 'fixtures/live_feed_sample.jsonl'
+BETS_FILEPATH = 'fixtures/prepared_bets_sample.csv'
+MAX_UPDATE_MS = 1000  # Sub-second repricing with a full slate in progress
+
+# Odds game ids whose state changes in each snapshot of the fixture feed
+ALL_GAMES = {f'odds-{i:02d}' for i in range(15)}
+CHANGED_GAMES = [
+    set(),  # Yesterday's finals, still on the board before rollover
+    ALL_GAMES,  # Today's slate, all scheduled
+    {f'odds-{i:02d}' for i in range(10)},  # Games 0-9 tip off
+    {f'odds-{i:02d}' for i in range(5)},  # Only games 0-4 move on
+    {f'odds-{i:02d}' for i in range(10, 15)},  # Games 10-14 tip off
+    ALL_GAMES,  # Games 0-7 final, the rest in the fourth quarter
+    {f'odds-{i:02d}' for i in range(8, 15)},  # Games 8-14 final; 0-7 unchanged
+]
+
+# Expected results for the first four games: (game_id, team, bet_type) -> result
+EXPECTED_RESULTS = {
+    # Hawks -3.5 win by 2: the underdog covers while losing
+    ('odds-00', 'Atlanta Hawks', 'h2h'): 'won',
+    ('odds-00', 'Atlanta Hawks', 'spreads'): 'lost',
+    ('odds-00', 'Boston Celtics', 'h2h'): 'lost',
+    ('odds-00', 'Boston Celtics', 'spreads'): 'won',
+    # Cavaliers -3.5 win by 10: the favourite covers
+    ('odds-01', 'Cleveland Cavaliers', 'spreads'): 'won',
+    ('odds-01', 'New Orleans Pelicans', 'spreads'): 'lost',
+    # Bulls -4 win by 4: both spreads push and are voided
+    ('odds-02', 'Chicago Bulls', 'h2h'): 'won',
+    ('odds-02', 'Chicago Bulls', 'spreads'): 'push',
+    ('odds-02', 'Dallas Mavericks', 'spreads'): 'push',
+    # Nuggets +2.5 lose by 6
+    ('odds-03', 'Denver Nuggets', 'spreads'): 'lost',
+    ('odds-03', 'Golden State Warriors', 'h2h'): 'won',
+    ('odds-03', 'Golden State Warriors', 'spreads'): 'won',
+}
+
+def check(condition, message):
+    if not condition:
+        print(f"FAILED: {message}")
+        exit(1)
+
+def build_tracker(bets_df):
+    tracker = LiveGameTracker(get_team_info())
+    # Every bet on its own plus every two-leg parlay across different games
+    for leg_id in bets_df.index:
+        tracker.add_parlay((leg_id,), bets_df.loc[[leg_id]])
+    for first, second in combinations(bets_df.index, 2):
+        if bets_df.loc[first, 'game_id'] != bets_df.loc[second, 'game_id']:
+            tracker.add_parlay((first, second), bets_df.loc[[first, second]])
+    return tracker
+
+def leg_ids_for(bets_df, game_ids):
+    return set(bets_df.index[bets_df['game_id'].isin(game_ids)])
+
+if __name__ == "__main__":
+    bets_df = pd.read_csv(BETS_FILEPATH)
+    tracker = build_tracker(bets_df)
+    print(f"Tracking {len(tracker.legs)} legs in {len(tracker.parlays)} parlays.")
+
+    timings = []
+    for step, snapshot in enumerate(replay_feed(FEED_FILEPATH)):
+        start = time.perf_counter()
+        rescored = tracker.update(snapshot)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings.append(elapsed_ms)
+        print(f"Snapshot {step}: {elapsed_ms:.1f} ms, {len(tracker.board)} games on the board, {len(rescored)} parlays rescored")
+
+        # Only parlays with a leg in a game whose state changed are rescored
+        changed_legs = leg_ids_for(bets_df, CHANGED_GAMES[step])
+        expected = {parlay_id for parlay_id, legs in tracker.parlays.items() if changed_legs & set(legs)}
+        check(rescored == expected, f"snapshot {step} rescored {len(rescored)} parlays, expected {len(expected)}")
+
+        # Only the final snapshot of the tracked slate ends a live run
+        check(tracker.slate_finished() == (step == len(CHANGED_GAMES) - 1), f"slate_finished wrong at snapshot {step}")
+
+        if step == 0:
+            check(not any(leg['result'] for leg in tracker.legs.values()), "yesterday's finals settled legs on today's games")
+        if step == 2:
+            in_play = leg_ids_for(bets_df, CHANGED_GAMES[2])
+            for leg_id, leg in tracker.legs.items():
+                repriced = leg['live_prob'] != leg['pregame_prob']
+                check(repriced == (leg_id in in_play), f"leg {leg_id} repriced={repriced} after tip-off of games 0-9")
+        if step == 5:
+            # Magic lead the Pacers by 9 with about three minutes left
+            leader = bets_df.index[(bets_df['team'] == 'Orlando Magic') & (bets_df['bet_type'] == 'h2h')][0]
+            check(tracker.legs[leader]['live_prob'] > 0.9, "late lead not reflected in the live probability")
+
+    # Every leg on tonight's slate is settled; the next night's game is not
+    for leg_id, bet in bets_df.iterrows():
+        result = tracker.legs[leg_id]['result']
+        if bet['game_id'] in ALL_GAMES:
+            check(result is not None, f"leg {leg_id} was not settled")
+        else:
+            check(result is None, f"leg {leg_id} on the next night's game was settled")
+        expected = EXPECTED_RESULTS.get((bet['game_id'], bet['team'], bet['bet_type']))
+        if expected is not None:
+            check(result == expected, f"{bet['team']} {bet['bet_type']} settled as {result}, expected {expected}")
+
+    # Pushes are voided rather than recorded as training labels
+    pushed = {leg_id for leg_id, leg in tracker.legs.items() if leg['result'] == 'push'}
+    check(pushed and not pushed & set(tracker.settled), "pushed legs were recorded as settled labels")
+
+    # A parlay is lost as soon as one leg lost and won once the rest won; pushed legs drop out at odds 1.0
+    for parlay_id, score in tracker.parlay_scores.items():
+        legs = [tracker.legs[leg_id] for leg_id in tracker.parlays[parlay_id]]
+        results = [leg['result'] for leg in legs]
+        expected = 'lost' if 'lost' in results else 'live' if None in results else 'won' if 'won' in results else 'push'
+        check(score['status'] == expected, f"parlay {parlay_id} is {score['status']}, expected {expected}")
+        odds = 1.0
+        for leg in legs:
+            odds *= 1.0 if leg['result'] == 'push' else leg['price']
+        check(score['cumulative_odds'] == round(odds, 2), f"parlay {parlay_id} odds {score['cumulative_odds']}, expected {round(odds, 2)}")
+
+    # Tied at the end of regulation: overtime can still produce a cover
+    tied = GameState('Atlanta Hawks', 'Boston Celtics', '2024-11-04', 100, 100, 4, 'PT00M00.00S', GAME_IN_PROGRESS)
+    favourite = {'team': 'Atlanta Hawks', 'bet_type': 'spreads', 'point': -3.5, 'pregame_prob': 0.5}
+    check(0 < live_win_probability(favourite, tied) < 0.5, "tied game heading to overtime priced as already decided")
+
+    check(max(timings) < MAX_UPDATE_MS, f"slowest update took {max(timings):.1f} ms")
+    print(f"Slowest update: {max(timings):.1f} ms, mean {sum(timings) / len(timings):.1f} ms over {len(timings)} snapshots.")
+    print("Replay check passed.")